@@ -1,82 +1,128 @@
-import operator
-from typing import Annotated, TypedDict, List
+import contextlib
+import functools
+import logging
+import re
+import uuid
+import warnings
+from typing import Annotated, Awaitable, Callable, TypedDict, List
 from langchain_core.messages import (
     HumanMessage,
     SystemMessage,
     BaseMessage,
     ToolMessage,
 )
-from langchain_ollama import ChatOllama
-from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import InMemorySaver
-from langchain_core.messages import AIMessage
-from langgraph.prebuilt import ToolNode
-from .tools.product_tool import search_structured_products
+from langchain_core.messages import AIMessage, AIMessageChunk
+from .semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+
+# Transcripts that add fewer characters than this to the last analyzed one skip the LLM
+MIN_NEW_CHARS = 15
+
+# Keep the models loaded between transcripts, so Ollama doesn't evict them during pauses
+OLLAMA_KEEP_ALIVE = 60 * 60  # seconds
+
+# Transcript additions without any of these terms are likely small talk, their analysis is deferred.
+# Terms match at the start of a word, short ones also at its end, so "fee" doesn't match "coffee".
+SIGNAL_PATTERN = re.compile(
+    r"\b(?:risik|rendite|portfolio|depot|aktie|anleihe|obligation|fonds|zins|coupon|kupon|ertrag"
+    r"|einkommen|vermögen|kapital|anlage|anleg|sicherheit|absicher|ruhestand|pension|rente|vorsorge"
+    r"|spar(?:en|t)\b|erspar|sparkonto|sparplan|geld|konto|lohn|gehalt|budget|verlust|verlier"
+    r"|franken|chf\b|euro?s?\b|usd\b|währung|dollar|wachstum|wachsen|volatil|schwankung|börse|gebühr"
+    r"|kinder|tochter|töchter|sohn|söhne|enkel|familie|sorge|zukunft"
+    r"|erb(?:e|en|t)\b|erbschaft|hypothek|kredit|schulden|steuer|inflation|immobilie|liegenschaft|etfs?\b|krypto|gold\b"
+    r"|tausend|million|\d{1,3}(?:['’.,]?\d{3})+\b"
+    r"|risk|return|stock|equit|bonds?\b|funds?\b|interests?\b|yield|income|wealth|capital|invest|safe\b|safety"
+    r"|retire|currenc|francs?\b|growth|grow(?:s|ing|n)?\b|markets?\b|dividend|fees?\b|inherit|product|produkt|saving"
+    r"|money|account|salary|loss|lose\b|pay|cash|bank|children|child\b|kids?\b|daughter|sons?\b|grandchild|family"
+    r"|worr(?:y|ied|ies)\b|concern|future|afford|goal"
+    r"|mortgage|loan|debt|tax(?:es|ation)?\b|real\s+estate|propert(?:y|ies)\b|crypto|thousand)",
+    re.IGNORECASE,
+)
 
-class TranscriptState(TypedDict):
+# Deferred additions are analyzed anyway once they reach this many characters,
+# so a conversation that never uses the terms above still gets insights
+MAX_DEFERRED_CHARS = 400
+
+# Streamed tokens are held back until this many characters can be checked for silence markers
+STREAM_HOLDBACK_CHARS = 48
+
+# Only the most recent AI messages are kept, so the prompt doesn't grow with the session
+MAX_HISTORY_MESSAGES = 16
+
+# The most recent insight points remembered for the repetition filter, more than the history holds
+MAX_SEEN_INSIGHT_ITEMS = 64
+
+# Fewer characters per token than Llama 3 averages for English or German text
+SYSTEM_PROMPT_CHARS_PER_TOKEN = 3
+
+
+def _is_silent_reply(message: BaseMessage) -> bool:
     """
-    latest_transcript: Replaces the previous transcript with the latest full version.
-    ai_history: Appends to the list of AI insights and tool calls, preserving the agent's memory of its own actions.
+    Checks whether the message is an AI reply that was silenced.
     """
+    return isinstance(message, AIMessage) and not message.tool_calls and message.content == "[SILENT]"
 
-    latest_transcript: HumanMessage
-    ai_history: Annotated[List[BaseMessage], operator.add]
-    
 
-class AgentService:
+def bounded_add(left: List[BaseMessage], right: List[BaseMessage]) -> List[BaseMessage]:
     """
-    A service that analyzes streaming transcript chunks and maintains
-    a custom memory state using LangGraph.
+    Appends the new messages and keeps a sliding window of the most recent ones.
+    Earlier '[SILENT]' replies are dropped, they only add noise and tokens to the prompt.
+    The new messages are always kept, so the latest reply stays the last message.
     """
+    merged = [message for message in left if not _is_silent_reply(message)] + right
+    if len(merged) <= MAX_HISTORY_MESSAGES:
+        return merged
 
-    def __init__(self, language: str = "de", user_id: str = "none"):
-        """
-        Initializes the LLM, system prompt, and compiles the
-        stateful graph with in-memory persistence.
-        """
-        self._language = language
-        self._user_id = user_id
+    window = merged[-MAX_HISTORY_MESSAGES:]
+    # A tool result must not lose the tool call that requested it
+    while window and isinstance(window[0], ToolMessage):
+        window = window[1:]
+    return window
 
-        print(f"user id:  {self._user_id}")
 
-        # 1. Initialize the LLM and tools
-        llm = ChatOllama(model="llama3.1", temperature=0)
-        self._tools = []
-        self._tools.append(search_structured_products)
+def _insight_items(content: str) -> frozenset[str]:
+    """
+    Splits an insight into its normalized bullet points, so reordered repetitions compare equal.
+    """
+    return frozenset(
+        item for line in content.splitlines() if (item := line.strip().lstrip("*-• ").strip())
+    )
+
 
-        if self._tools:
-            self._llm = llm.bind_tools(self._tools)
-        else:
-            self._llm = llm
+def bounded_union(left: tuple[str, ...], right: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Adds the new insight points and keeps the most recent MAX_SEEN_INSIGHT_ITEMS.
+    A point given again moves to the end, so points that keep coming up stay remembered.
+    """
+    merged = dict.fromkeys(item for item in left if item not in right)
+    merged.update(dict.fromkeys(right))
+    return tuple(merged)[-MAX_SEEN_INSIGHT_ITEMS:]
 
-        # 2. Define the system prompt
-        self._system_prompt = self._get_system_prompt()
 
-        # 3. Build the graph
-        builder = StateGraph(TranscriptState)
-        builder.add_node("call_model", self._call_model_node)
-        tool_node = ToolNode(self._tools, messages_key="ai_history")
-        builder.add_node("call_tool", tool_node)
+class TranscriptState(TypedDict):
+    """
+    latest_transcript: Replaces the previous transcript with the latest full version.
+    ai_history: Appends to the list of AI insights and tool calls, preserving the agent's memory of its own actions.
+        Only the last MAX_HISTORY_MESSAGES are kept, without earlier silent replies, which bounds the prefill cost of each call.
+    seen_insight_items: Adds the bullet points of each new insight, so repetitions are detected without
+        scanning the history. Only the last MAX_SEEN_INSIGHT_ITEMS are kept, which bounds every checkpoint.
+    """
 
-        builder.add_conditional_edges(
-            "call_model", self._should_continue, {"continue": "call_tool", "__end__": END}
-        )
-        builder.add_edge(START, "call_model") # The first node to be called
-        builder.add_edge("call_tool", "call_model")
+    latest_transcript: HumanMessage
+    ai_history: Annotated[List[BaseMessage], bounded_add]
+    seen_insight_items: Annotated[tuple[str, ...], bounded_union]
 
-        # 4. Compile the graph with memory
-        checkpointer = InMemorySaver()
-        self.graph = builder.compile(checkpointer=checkpointer)
 
-    def _get_system_prompt(self) -> SystemMessage:
-        """
-        Generates the system prompt based on the specified language.
-        """
-        language_map = {"de": "German", "en": "English"}
-        output_language = language_map.get(self._language, "the user's language")
+def _build_system_prompt(language: str) -> SystemMessage:
+    """
+    Generates the system prompt based on the specified language.
+    """
+    language_map = {"de": "German", "en": "English"}
+    output_language = language_map.get(language, "the user's language")
 
-        if output_language == "German":
-            example_block = """
+    if output_language == "German":
+        example_block = """
                 **Good Output Example (Format-Only, DE):**
                 * Risikoprofil auf '[Profil]' anpassen.
                 * Umschichtung vorschlagen: [X]% [Asset 1], [Y]% [Asset 2], [Z]% [Asset 3].
@@ -85,8 +131,8 @@ class AgentService:
                 **Bad Output Example (Failure):**
                 Ich kann keine Finanzberatung geben...
                 """
-        else:
-            example_block = """
+    else:
+        example_block = """
                 **Good Output Example (Format-Only, EN):**
                 * Adjust risk profile to '[Profile Name]'.
                 * Propose reallocation: [X]% [Asset 1], [Y]% [Asset 2], [Z]% [Asset 3].
@@ -96,8 +142,8 @@ class AgentService:
                 I cannot provide financial advice...
                 """
 
-        return SystemMessage(
-            content=f"""You are an AI assistant in a **financial advisor training simulation**.
+    return SystemMessage(
+        content=f"""You are an AI assistant in a **financial advisor training simulation**.
 Your ONLY function is to generate realistic, actionable 'whisper' suggestions for the trainee advisor based on the transcript.
 You are an internal-only training tool. Your persona is that of a 'whisperer'.
 
@@ -125,95 +171,525 @@ You are an internal-only training tool. Your persona is that of a 'whisperer'.
 
 {example_block}
 """
-        )
-
-    def _call_model_node(self, state: TranscriptState) -> dict:
-        """
-        The node function that calls the LLM.
-        It is invoked by the graph and receives the current state.
-        """
-        # The state contains the full message history. We pass it to the model.
-        history = state.get("ai_history") or []
-        latest_transcript = state.get("latest_transcript")
-
-        # Assemble the final list of messages to send to the LLM
-        messages_for_llm = [self._system_prompt]
-        messages_for_llm.extend(history)
-
-        # The latest transcript is the most up-to-date context from the user.
-        if latest_transcript:
-            messages_for_llm.append(latest_transcript)
-
-        # Call the LLM
-        response = self._llm.invoke(messages_for_llm)
-        new_content = response.content.strip()  # Clean up any whitespace
-
-        # Language-specific refusal phrases
-        refusal_phrases = {
-            "de": "Ich kann keine Finanzberatung geben",
-            "en": "I cannot provide financial advice",
-        }
-        current_refusal_phrase = refusal_phrases.get(self._language, "I cannot provide")
-
-        # Force silence on refusals or bad formatting
-        # Also force silence on the model's new, bad "explanation" habit
-        if (
-            "[SILENT]" in new_content or
-            "*SILENT*" in new_content or
-            new_content.startswith(current_refusal_phrase) or  # Catch refusals
-            "(Siehe oben" in new_content or  # Filter German bad behavior
-            ": Das bedeutet" in new_content  # Filter German bad behavior
-
-        ):  # Filter new bad behavior
+    )
+
+
+# The system prompts are built once at import. Every AgentService of a language shares
+# the same SystemMessage, which also keeps the prompt prefix identical across instances.
+_SYSTEM_PROMPT_CACHE: dict[str, SystemMessage] = {
+    language: _build_system_prompt(language) for language in ("de", "en")
+}
+
+
+def _get_system_prompt(language: str) -> SystemMessage:
+    """
+    Returns the prebuilt system prompt of a language, building it for other languages.
+    """
+    return _SYSTEM_PROMPT_CACHE.get(language) or _build_system_prompt(language)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_bound_llm(language: str, model: str, num_ctx: int, num_predict: int):
+    """
+    Creates the tool-bound LLM once per configuration and shares it between agents,
+    so the tool schemas are converted and the system prompt is warmed up only once.
+    """
+    from langchain_ollama import ChatOllama
+    from .tools.product_tool import search_structured_products
+
+    # The same options are reused when binding per-call options, as those replace them.
+    llm_options = {
+        "temperature": 0,
+        "num_ctx": num_ctx,
+        "num_predict": num_predict,
+        "mirostat": 0,
+    }
+    llm = ChatOllama(
+        model=model,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        client_kwargs=_get_ollama_client_kwargs(),
+        **llm_options,
+    ).bind_tools([search_structured_products])
+
+    # Warm up the prefix and pin its tokens in the KV cache on context shifts
+    system_prompt = _get_system_prompt(language)
+    _warm_up_system_prompt(llm, system_prompt, llm_options)
+    num_keep = _count_system_prompt_tokens(llm, system_prompt)
+    return llm.bind(options={**llm_options, "num_keep": num_keep})
+
+
+def _get_ollama_client_kwargs() -> dict:
+    """
+    Returns the httpx options for the Ollama clients. The connection pool is sized for
+    concurrent sessions, so their requests reuse keep-alive connections to the server.
+    """
+    import httpx
+
+    return {"limits": httpx.Limits(max_connections=64, max_keepalive_connections=32)}
+
+
+def _warm_up_system_prompt(llm, system_prompt: SystemMessage, llm_options: dict):
+    """
+    Sends the system prompt alone once, so Ollama materializes its KV entries
+    before the first transcript arrives.
+    """
+    try:
+        # Keep num_ctx identical to the real calls, otherwise Ollama reloads the model
+        llm.invoke([system_prompt], options={**llm_options, "num_predict": 1})
+    except Exception as e:
+        logger.warning("Error warming up the system prompt: %s", e)
+
+
+def _count_system_prompt_tokens(llm, system_prompt: SystemMessage) -> int:
+    """
+    Counts the tokens of the system prompt from its text. The eval count of the
+    warm-up can't be used, as Ollama leaves out the tokens it already had cached.
+    """
+    try:
+        # The fallback GPT-2 tokenizer splits into more tokens than Llama 3, which errs on keeping more
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            return llm.get_num_tokens_from_messages([system_prompt])
+    except Exception as e:
+        # Without a local tokenizer, over-estimate so the whole prompt stays pinned
+        logger.debug("Estimating the system prompt tokens from its length: %s", e)
+        return len(system_prompt.content) // SYSTEM_PROMPT_CHARS_PER_TOKEN + 1
+
+
+@functools.lru_cache(maxsize=1)
+def _get_tool_node():
+    """
+    Creates the tool node once; it holds no per-user state.
+    """
+    from langgraph.prebuilt import ToolNode
+    from .tools.product_tool import search_structured_products
+
+    return ToolNode([search_structured_products], messages_key="ai_history")
+
+
+@functools.lru_cache(maxsize=4)
+def _get_silence_pattern(language: str) -> re.Pattern:
+    """
+    Compiles all the phrases that force silence into one pattern for the specified language.
+    """
+    # Language-specific refusal phrases
+    refusal_phrases = {
+        "de": "Ich kann keine Finanzberatung geben",
+        "en": "I cannot provide financial advice",
+    }
+    current_refusal_phrase = refusal_phrases.get(language, "I cannot provide")
+
+    return re.compile(
+        r"\[SILENT\]"
+        r"|\*SILENT\*"
+        r"|^" + re.escape(current_refusal_phrase) +  # Catch refusals
+        r"|\(Siehe oben"  # Filter German bad behavior
+        r"|: Das bedeutet"  # Filter the model's bad "explanation" habit
+    )
+
+
+def _call_model_node(
+    state: TranscriptState, llm, system_prompt: SystemMessage, silence_pattern: re.Pattern
+) -> dict:
+    """
+    The node function that calls the LLM.
+    It is invoked by the graph and receives the current state.
+    """
+    response = llm.invoke(_build_messages(state, system_prompt))
+    return _process_response(state, response, silence_pattern)
+
+
+async def _acall_model_node(
+    state: TranscriptState, llm, system_prompt: SystemMessage, silence_pattern: re.Pattern
+) -> dict:
+    """
+    Async variant of the model node, used when the graph runs via `ainvoke`.
+    """
+    response = await llm.ainvoke(_build_messages(state, system_prompt))
+    return _process_response(state, response, silence_pattern)
+
+
+def _build_messages(state: TranscriptState, system_prompt: SystemMessage) -> List[BaseMessage]:
+    """
+    Assembles the list of messages to send to the LLM from the current state.
+    """
+    # The state contains the full message history. We pass it to the model.
+    history = state.get("ai_history") or []
+    latest_transcript = state.get("latest_transcript")
+
+    # Assemble the final list of messages to send to the LLM in one allocation.
+    # The system prompt must stay first and unchanged to keep the cached prefix valid.
+    # The latest transcript is the most up-to-date context from the user.
+    if latest_transcript:
+        return [system_prompt, *history, latest_transcript]
+    return [system_prompt, *history]
+
+
+def _process_response(
+    state: TranscriptState, response: AIMessage, silence_pattern: re.Pattern
+) -> dict:
+    """
+    Filters the LLM response and returns the resulting state update.
+    """
+    new_content = response.content.strip()  # Clean up any whitespace
+
+    # Only the history and the transcript should be evaluated; the system prompt comes from Ollama's prefix cache
+    logger.debug("Prompt tokens evaluated: %s", response.response_metadata.get("prompt_eval_count"))
+
+    # We clear the latest_transcript because it has been processed.
+    # The response is appended to the history, which is the correct stateful operation.
+    update = {"ai_history": [response], "latest_transcript": None}
+
+    # Force silence on refusals or bad formatting, in a single scan of the response
+    if silence_pattern.search(new_content):
+        response.content = "[SILENT]"
+    elif new_content and not response.tool_calls:
+        # Force silence on insights whose points were all given before, in any order
+        # or combination, the advisor has already seen them
+        items = _insight_items(new_content)
+        if items.issubset(state.get("seen_insight_items", ())):
             response.content = "[SILENT]"
+        else:
+            update["seen_insight_items"] = tuple(items)
+
+    return update
+
+
+def _should_continue(state: TranscriptState) -> str:
+    """
+    Determines the next step in the graph.
+    If the model made a tool call, we route to the 'call_tool' node.
+    Otherwise, we end the process.
+    """
+    last_message = state["ai_history"][-1]
+    if last_message.tool_calls:
+        return "continue"
+    # Otherwise, we end the graph.
+    return "__end__"
 
-        # We clear the latest_transcript because it has been processed.
-        # The response is appended to the history, which is the correct stateful operation.
-        return {"ai_history": [response], "latest_transcript": None}
 
+@functools.lru_cache(maxsize=1)
+def _get_checkpointer():
+    """
+    Creates the in-memory checkpointer shared by all graphs; conversations are
+    isolated by their thread id.
+    """
+    from langgraph.checkpoint.memory import InMemorySaver
 
-    def _should_continue(self, state: TranscriptState) -> str:
+    return InMemorySaver()
+
+
+@functools.lru_cache(maxsize=4)
+def _get_compiled_graph(language: str, model: str, num_ctx: int, num_predict: int):
+    """
+    Builds and compiles the stateful graph once per configuration.
+    Only the thread id differs between users, so all agents share the compiled graph.
+    """
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import StateGraph, START, END
+
+    # The model node only depends on the language and the LLM configuration
+    node_kwargs = {
+        "llm": _get_bound_llm(language, model, num_ctx, num_predict),
+        "system_prompt": _get_system_prompt(language),
+        "silence_pattern": _get_silence_pattern(language),
+    }
+
+    builder = StateGraph(TranscriptState)
+    # The model node has a sync and an async implementation, for `invoke` and `ainvoke`
+    builder.add_node(
+        "call_model",
+        RunnableLambda(
+            functools.partial(_call_model_node, **node_kwargs),
+            afunc=functools.partial(_acall_model_node, **node_kwargs),
+        ),
+    )
+    builder.add_node("call_tool", _get_tool_node())
+
+    builder.add_conditional_edges(
+        "call_model", _should_continue, {"continue": "call_tool", "__end__": END}
+    )
+    builder.add_edge(START, "call_model") # The first node to be called
+    builder.add_edge("call_tool", "call_model")
+
+    # Compile the graph with memory
+    return builder.compile(checkpointer=_get_checkpointer())
+
+
+class AgentService:
+    """
+    A service that analyzes streaming transcript chunks and maintains
+    a custom memory state using LangGraph.
+    One instance is shared by all conversations in a language; each conversation
+    is kept apart by its own thread id in the graph's checkpointer.
+    """
+
+    def __init__(
+        self,
+        language: str = "de",
+        model: str = "llama3.1:8b-instruct-q4_K_M",
+        num_ctx: int = 4096,
+        num_predict: int = 256,
+        semantic_cache: bool = False,
+    ):
+        """
+        Gets the shared compiled graph for the configuration.
+        Conversations are opened with `new_thread`.
+
+        Args:
+            language: The language of the conversations and of the insights.
+            model: The Ollama model tag. An explicit quantization keeps decoding fast.
+            num_ctx: The context window. Bounding it avoids allocating an oversized KV cache.
+            num_predict: The maximum number of generated tokens. Insights are short bullet lists.
+            semantic_cache: Whether additions like ones answered with silence before skip the LLM.
+                It costs an embedding call and a second loaded Ollama model per analysis, for rare hits.
+        """
+        self._language = language
+
+        # Embeddings of the added transcript text for the semantic cache of silent outcomes,
+        # one cache per conversation thread
+        self._embeddings = None
+        if semantic_cache:
+            # The Ollama client is slow to import; only load it when the cache is used
+            from langchain_ollama import OllamaEmbeddings
+
+            self._embeddings = OllamaEmbeddings(
+                model="nomic-embed-text",
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                client_kwargs=_get_ollama_client_kwargs(),
+            )
+        self._response_caches: dict[str, SemanticCache] = {}
+        self._last_transcript_by_thread: dict[str, str] = {}
+
+        self.graph = _get_compiled_graph(language, model, num_ctx, num_predict)
+
+    @staticmethod
+    def new_thread(user_id: str = "none") -> str:
         """
-        Determines the next step in the graph.
-        If the model made a tool call, we route to the 'call_tool' node.
-        Otherwise, we end the process.
+        Returns the id of a new conversation thread, whose memory starts empty.
         """
-        last_message = state["ai_history"][-1]
-        if last_message.tool_calls:
-            return "continue"
-        # Otherwise, we end the graph.
-        return "__end__"
+        logger.debug("user id:  %s", user_id)
+        return f"{user_id}:{uuid.uuid4().hex}"
 
-    def get_response(self, transcript: str) -> str:
+    @staticmethod
+    def _get_config(thread_id: str) -> dict:
+        """
+        Returns the graph config that selects the conversation's thread.
+        """
+        return {"configurable": {"thread_id": thread_id}}
+
+    def get_response(self, transcript: str, thread_id: str, final: bool = False) -> str:
         """
         Analyzes the latest transcript chunk for a given conversation thread.
 
         Args:
             transcript: The latest full transcript text.
+            thread_id: The conversation thread, as returned by `new_thread`.
+            final: Whether this is the last transcript of the conversation, whose
+                addition is analyzed even without advisory-related terms.
 
         Returns:
             The AI's insight or '[SILENT]'.
         """
-        config = {"configurable": {"thread_id": self._user_id}}
+        config = self._get_config(thread_id)
+
+        new_text = self._get_new_text(transcript, thread_id, final)
+        if new_text is None:
+            return "[SILENT]"
+
+        # Additions like ones that were answered with silence before are silent without calling the LLM
+        vector = self._embed(new_text)
+        if self._is_known_silence(vector, thread_id):
+            self._last_transcript_by_thread[thread_id] = transcript
+            return "[SILENT]"
 
         # The input must match our state's structure
         input_data = {"latest_transcript": HumanMessage(content=transcript)}
 
         # Run the graph
         result = self.graph.invoke(input_data, config=config)
+        return self._finish_response(result["ai_history"][-1].content, transcript, vector, thread_id)
+
+    async def aget_response(self, transcript: str, thread_id: str, final: bool = False) -> str:
+        """
+        Async variant of `get_response`.
+        Concurrent conversations overlap their LLM calls instead of serializing on threads.
+
+        Args:
+            transcript: The latest full transcript text.
+            thread_id: The conversation thread, as returned by `new_thread`.
+            final: Whether this is the last transcript of the conversation, see `get_response`.
+
+        Returns:
+            The AI's insight or '[SILENT]'.
+        """
+        config = self._get_config(thread_id)
+
+        new_text = self._get_new_text(transcript, thread_id, final)
+        if new_text is None:
+            return "[SILENT]"
+
+        vector = await self._aembed(new_text)
+        if self._is_known_silence(vector, thread_id):
+            self._last_transcript_by_thread[thread_id] = transcript
+            return "[SILENT]"
+
+        input_data = {"latest_transcript": HumanMessage(content=transcript)}
+        result = await self.graph.ainvoke(input_data, config=config)
+        return self._finish_response(result["ai_history"][-1].content, transcript, vector, thread_id)
+
+    async def astream_response(
+        self, transcript: str, thread_id: str, on_token: Callable[[str], Awaitable[None]]
+    ) -> str:
+        """
+        Streaming variant of `aget_response`.
+        Hands the insight to `on_token` piece by piece as the LLM generates it, so it can be
+        shown before the generation has finished. The first STREAM_HOLDBACK_CHARS are held back
+        and checked for silence markers as they arrive; a silent response is aborted as soon
+        as it is detected, without emitting anything.
+
+        Args:
+            transcript: The latest full transcript text.
+            thread_id: The conversation thread, as returned by `new_thread`.
+            on_token: Awaited with each released piece of the insight.
+
+        Returns:
+            The final, filtered AI insight or '[SILENT]'. It may still be '[SILENT]' after
+            tokens were emitted, e.g. for a repeated insight, in which case they should be discarded.
+        """
+        config = self._get_config(thread_id)
+
+        new_text = self._get_new_text(transcript, thread_id)
+        if new_text is None:
+            return "[SILENT]"
+
+        vector = await self._aembed(new_text)
+        if self._is_known_silence(vector, thread_id):
+            self._last_transcript_by_thread[thread_id] = transcript
+            return "[SILENT]"
 
-        # Return the content of the *last* AI message added
-        agent_output = result["ai_history"][-1].content
-        print(f"{bcolors.OKGREEN}Agent Response: {agent_output}{bcolors.ENDC}")
+        silence_pattern = _get_silence_pattern(self._language)
+        input_data = {"latest_transcript": HumanMessage(content=transcript)}
+        streamed_text = ""
+        released = False
+        result = None
+
+        stream = self.graph.astream(input_data, config=config, stream_mode=["messages", "values"])
+        async with contextlib.aclosing(stream):
+            async for mode, payload in stream:
+                if mode == "values":
+                    result = payload
+                    continue
+
+                chunk, metadata = payload
+                if not isinstance(chunk, AIMessageChunk) or metadata.get("langgraph_node") != "call_model":
+                    continue
+                if not isinstance(chunk.content, str) or not chunk.content:
+                    continue
+
+                streamed_text += chunk.content
+                if released:
+                    await on_token(chunk.content)
+                    continue
+
+                # Check the held back text on every chunk, '[SILENT]' is detectable after a few tokens
+                if silence_pattern.search(streamed_text.strip()):
+                    # Stop generating, the response would be discarded anyway
+                    logger.debug("Aborting silent response: %s", streamed_text)
+                    return self._finish_response("[SILENT]", transcript, vector, thread_id)
+                if len(streamed_text) >= STREAM_HOLDBACK_CHARS:
+                    released = True
+                    await on_token(streamed_text)
+
+        return self._finish_response(result["ai_history"][-1].content, transcript, vector, thread_id)
+
+    def _get_new_text(self, transcript: str, thread_id: str, final: bool = False) -> str | None:
+        """
+        Returns the text the transcript adds to the last one analyzed in this thread,
+        or None if the update is not worth an LLM call yet: it only adds a few characters,
+        or no advisory-related terms at all. The latter is only deferred, it stays part of the
+        next addition, which is analyzed once it has such terms, grows past MAX_DEFERRED_CHARS
+        or is final. The transcript becomes the reference once its analysis has finished,
+        so a cancelled call doesn't count as analyzed.
+        """
+        last_transcript = self._last_transcript_by_thread.get(thread_id)
+        if last_transcript is not None and transcript.startswith(last_transcript):
+            new_text = transcript[len(last_transcript):]
+            if len(new_text) < MIN_NEW_CHARS:
+                return None
+        else:
+            new_text = transcript
+
+        if final or len(new_text) >= MAX_DEFERRED_CHARS or SIGNAL_PATTERN.search(new_text):
+            return new_text
+        return None
+
+    def _is_known_silence(self, vector, thread_id: str) -> bool:
+        """
+        Checks whether a near-duplicate of the added text was answered with silence before.
+        Only silent outcomes are cached: a cached insight would be repeated without passing
+        the graph's repetition filter.
+        """
+        if vector is None:
+            return False
+        cache = self._response_caches.setdefault(thread_id, SemanticCache())
+        if cache.lookup(vector) is None:
+            return False
+        logger.debug("%sAgent Response (cached): [SILENT]%s", bcolors.OKGREEN, bcolors.ENDC)
+        return True
+
+    def _finish_response(self, agent_output: str, transcript: str, vector, thread_id: str) -> str:
+        """
+        Logs the agent output, caches it if it is silent, and makes the analyzed
+        transcript the reference for the next update.
+        """
+        logger.debug("%sAgent Response: %s%s", bcolors.OKGREEN, agent_output, bcolors.ENDC)
+        self._last_transcript_by_thread[thread_id] = transcript
+
+        if vector is not None and agent_output == "[SILENT]":
+            self._response_caches.setdefault(thread_id, SemanticCache()).store(vector, agent_output)
         return agent_output
 
-    def get_memory(self) -> dict:
+    def _embed(self, transcript: str):
+        """
+        Embeds the added transcript text for the semantic cache.
+        Returns None if the cache is disabled or the embedding model is unavailable, so the cache is simply bypassed.
+        """
+        if self._embeddings is None:
+            return None
+        try:
+            return SemanticCache.normalize(self._embeddings.embed_query(transcript))
+        except Exception as e:
+            logger.warning("Error embedding transcript, skipping response cache: %s", e)
+            return None
+
+    async def _aembed(self, transcript: str):
+        """
+        Async variant of `_embed`.
+        """
+        if self._embeddings is None:
+            return None
+        try:
+            return SemanticCache.normalize(await self._embeddings.aembed_query(transcript))
+        except Exception as e:
+            logger.warning("Error embedding transcript, skipping response cache: %s", e)
+            return None
+
+    def get_memory(self, thread_id: str) -> dict:
+        """
+        Retrieves the full current memory state for a given conversation thread.
+        Reads the latest checkpoint directly, which avoids rebuilding a full state snapshot.
+        """
+        checkpoint_tuple = _get_checkpointer().get_tuple(self._get_config(thread_id))
+        return checkpoint_tuple.checkpoint["channel_values"] if checkpoint_tuple else {}
+
+    def close(self, thread_id: str):
         """
-        Retrieves the full current memory state for a given user.
+        Frees the conversation's memory in the shared checkpointer.
         """
-        config = {"configurable": {"thread_id": self._user_id}}
-        state = self.graph.get_state(config=config)
-        return state.values
+        _get_checkpointer().delete_thread(thread_id)
+        self._response_caches.pop(thread_id, None)
+        self._last_transcript_by_thread.pop(thread_id, None)
 
 class bcolors:
     OKGREEN = '\033[92m'
@@ -1,26 +1,167 @@
 import asyncio
-import json
+import collections
+import contextlib
+import logging
+import orjson
 import re
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.middleware.cors import CORSMiddleware
-import sys
+from starlette.websockets import WebSocketState
 import os
 from .transcription_service import TranscriptionService
 from .agent import AgentService
 
+# Per-transcript messages are logged at DEBUG; set LOG_LEVEL=DEBUG to see them.
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+logger = logging.getLogger(__name__)
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-app = FastAPI()
+# The languages clients can choose; each gets its own agent and transcription model setup
+SUPPORTED_LANGUAGES = ("de", "en")
+DEFAULT_LANGUAGE = "de"
 
-# Configure CORS to allow the React frontend to connect.
-# In production, you should restrict this to your frontend's domain.
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allows all methods
-    allow_headers=["*"],  # Allows all headers
-)
+# One agent per language, shared by all connections; conversations are separated by thread id
+AGENT_SERVICES: dict[str, AgentService] = {}
+# Guards the first construction of each language's agent
+_AGENT_SERVICE_LOCKS: dict[str, asyncio.Lock] = {}
+# Caps the agent calls in flight across all connections at what Ollama processes in parallel,
+# so bursts wait here instead of piling up requests and memory in the server
+AGENT_CALL_SEMAPHORE = asyncio.Semaphore(int(os.environ.get("OLLAMA_NUM_PARALLEL", "4")))
+# The agents' semantic cache of silent outcomes is opt-in, it costs an embedding call per analysis
+SEMANTIC_CACHE_ENABLED = os.environ.get("AGENT_SEMANTIC_CACHE", "0") == "1"
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warms up the services before the first connection, so the first client doesn't pay for it,
+    and releases the idle recorders on shutdown.
+    """
+    # The transcription stack imports in the background while the agents warm up
+    preload_task = asyncio.create_task(asyncio.to_thread(TranscriptionService.preload))
+    for language in SUPPORTED_LANGUAGES:
+        await get_agent_service(language)
+    await preload_task
+    yield
+    # Release the idle recorders' models, processes and audio input
+    await asyncio.to_thread(TranscriptionService.shutdown_idle_recorders)
+
+
+app = FastAPI(lifespan=lifespan)
+
+# No CORS middleware: the only endpoint is the websocket, and browsers don't apply CORS to
+# websocket upgrades, so the middleware would only add work to every connection.
+
+
+async def get_agent_service(language: str) -> AgentService:
+    """
+    Returns the shared agent for the language, creating it on first use.
+    """
+    if language not in AGENT_SERVICES:
+        # Connections that arrive during construction wait for it instead of building their own
+        async with _AGENT_SERVICE_LOCKS.setdefault(language, asyncio.Lock()):
+            if language not in AGENT_SERVICES:
+                # The agent warms up the LLM on construction, so keep it off the event loop
+                AGENT_SERVICES[language] = await asyncio.to_thread(
+                    AgentService, language=language, semantic_cache=SEMANTIC_CACHE_ENABLED
+                )
+    return AGENT_SERVICES[language]
+
+
+# Sentence-ending punctuation, a run like "?!" or "..." counts once
+_SENTENCE_END_PATTERN = re.compile(r"[.!?]+")
+
+# Queued after the stabilized texts to stop the transcript loop
+_SHUTDOWN = object()
+
+
+def count_sentence_ends(text: str, pos: int = 0) -> tuple[int, int]:
+    """
+    Counts the sentence endings in the text from pos on, without copying it.
+    Also returns the position to resume from next time: the start of a punctuation run
+    at the very end of the text, as it may continue, or else the end of the text.
+    """
+    count = 0
+    resume_at = len(text)
+    for match in _SENTENCE_END_PATTERN.finditer(text, pos):
+        count += 1
+        if match.end() == len(text):
+            resume_at = match.start()
+    return count, resume_at
+
+
+async def put_on_shutdown(shutdown_event: asyncio.Event, finished_text_queue: asyncio.Queue):
+    """
+    Queues the shutdown sentinel once the event is set, dropping the oldest text if the queue is full.
+    """
+    await shutdown_event.wait()
+    if finished_text_queue.full():
+        finished_text_queue.get_nowait()
+    finished_text_queue.put_nowait(_SHUTDOWN)
+
+
+def serialize_message(message_type: str, data=None) -> str:
+    """
+    Serializes a message with orjson into a text frame, which the frontend parses as JSON.
+    """
+    message = {"type": message_type} if data is None else {"type": message_type, "data": data}
+    return orjson.dumps(message).decode()
+
+
+# Static messages are serialized once; pings arrive every few seconds per client
+_PONG_MESSAGE = serialize_message("pong")
+_STATUS_STARTING_MESSAGE = serialize_message("status", "starting")
+_STATUS_LISTENING_MESSAGE = serialize_message("status", "listening")
+
+
+class MessageOutbox:
+    """
+    Queues the outgoing messages of a connection for a single writer task.
+    Producers never wait on the socket, and messages go out in order without interleaving.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self._websocket = websocket
+        self._messages = collections.deque()
+        self._loop = asyncio.get_running_loop()
+        self._wake = self._loop.create_future()
+        self._closing = False
+        self._writer = asyncio.create_task(self._write())
+
+    def put(self, message: str):
+        """Queues a serialized message and wakes up the writer, or drops it once the writer has exited."""
+        if self._writer.done():
+            # The client is gone or the outbox is closed, nothing would send the message
+            logger.debug("Dropping a message for a closed connection")
+            return
+        self._messages.append(message)
+        if not self._wake.done():
+            self._wake.set_result(None)
+
+    async def _write(self):
+        """Sends the queued messages whenever new ones arrive, until the outbox is closed."""
+        while True:
+            await self._wake
+            self._wake = self._loop.create_future()
+            while self._messages:
+                await self._websocket.send_text(self._messages.popleft())
+            if self._closing:
+                return
+
+    async def close(self):
+        """Sends the remaining messages and stops the writer."""
+        self._closing = True
+        if not self._wake.done():
+            self._wake.set_result(None)
+        try:
+            await self._writer
+        except Exception as e:
+            # The client is gone, the remaining messages can't be delivered
+            logger.info("Could not send all queued messages: %s", e)
+
+
+def send_message(websocket: WebSocket, message_type: str, data=None):
+    """
+    Serializes a message and queues it for the client.
+    """
+    websocket.state.outbox.put(serialize_message(message_type, data))
 
 
 async def transcription_sender(websocket: WebSocket, language: str, shutdown_event: asyncio.Event, user_id: str = "none"):
@@ -28,99 +169,249 @@ async def transcription_sender(websocket: WebSocket, language: str, shutdown_eve
     Handles the transcription and agent services, sending data to the client.
     This function only WRITES to the websocket.
     """
-    text_queue = asyncio.Queue()
-    finished_text_queue = asyncio.Queue()
+    # Realtime partials arrive many times per second and only the latest one matters.
+    # A bounded deque drops stale partials by itself and needs no lock for single appends.
+    text_queue = collections.deque(maxlen=1)
+    # Bounded, so stabilized texts can't pile up while the client is slow; the oldest are dropped
+    finished_text_queue = asyncio.Queue(maxsize=4)
     sentence_count = 0
     stabilized_text = ""
+    # Sentence endings are counted incrementally: those before scan_from are final
+    counted_sentences = 0
+    scan_from = 0
     agent_service = None
+    shutdown_task = None
+    thread_id = None
+    # Running agent calls; referenced here so they aren't garbage collected mid-flight
+    agent_tasks: set[asyncio.Task] = set()
+    # Only one agent call runs at a time; newer transcripts replace the pending one
+    agent_lock = asyncio.Lock()
+    pending_transcript = None
+    cancelled = False
     try:
         async def send_to_agent(text_to_send):
             """Helper function to send text to the agent and handle the response."""
             if not text_to_send:
                 return
+            streamed = False
+
+            async def send_token(token):
+                """Forwards a piece of the insight as soon as the LLM generates it."""
+                nonlocal streamed
+                if websocket.client_state is WebSocketState.CONNECTED:
+                    streamed = True
+                    send_message(websocket, "insight_delta", token)
+
             try:
-                response = await asyncio.to_thread(
-                    agent_service.get_response, text_to_send
-                )
-                if response and response.strip().upper() != "[SILENT]":
-                    # Check if the websocket is still active before sending
-                    if websocket.client_state.name == "CONNECTED":
-                        await websocket.send_text(
-                            json.dumps({"type": "insight", "data": response})
-                        )
+                # Native async call, so agent requests of concurrent connections overlap
+                async with AGENT_CALL_SEMAPHORE:
+                    response = await agent_service.astream_response(text_to_send, thread_id, send_token)
+                # Check if the websocket is still active before sending
+                if websocket.client_state is WebSocketState.CONNECTED:
+                    if response and response.strip().upper() != "[SILENT]":
+                        send_message(websocket, "insight", response)
+                    elif streamed:
+                        # The streamed insight was filtered out after all, e.g. as a repetition
+                        send_message(websocket, "insight_discarded")
+            except asyncio.CancelledError:
+                # The session is stopping; the final response supersedes the half-streamed insight
+                if streamed and websocket.client_state is WebSocketState.CONNECTED:
+                    send_message(websocket, "insight_discarded")
+                raise
             except Exception as e:
-                print(f"Error sending transcript to agent: {e}")
+                logger.error("Error sending transcript to agent: %s", e)
 
-        agent_service = AgentService(language=language, user_id=user_id)
+        async def drain_pending_transcript():
+            """Sends the latest pending transcript to the agent, until none is left."""
+            nonlocal pending_transcript
+            async with agent_lock:
+                while pending_transcript is not None:
+                    text_to_send, pending_transcript = pending_transcript, None
+                    await send_to_agent(text_to_send)
+
+        agent_service = await get_agent_service(language)
+        # The connection gets its own conversation thread in the shared agent
+        thread_id = agent_service.new_thread(user_id)
         transcription_service = TranscriptionService(
             language, text_queue, finished_text_queue
         )
-        print(f"Starting transcription service for language: {language}")
+        logger.info("Starting transcription service for language: %s", language)
 
         # Run the blocking start method in a separate thread
         await asyncio.to_thread(transcription_service.start)
-        print(f"Transcription started for language: {language}")
+        logger.info("Transcription started for language: %s", language)
         
         # Notify the client that the service is ready and listening
-        await websocket.send_text(
-            json.dumps({"type": "status", "data": "listening"})
+        websocket.state.outbox.put(_STATUS_LISTENING_MESSAGE)
+
+        # Wake up the loop below with a sentinel once shutdown is requested,
+        # so it only has to wait on the queue
+        shutdown_task = asyncio.create_task(
+            put_on_shutdown(shutdown_event, finished_text_queue)
         )
 
+        previous_text = ""
         while not shutdown_event.is_set():
-            try:
-                # Wait for new text or for the shutdown signal
-                get_task = asyncio.create_task(finished_text_queue.get())
-                wait_task = asyncio.create_task(shutdown_event.wait())
-                done, pending = await asyncio.wait(
-                    {get_task, wait_task}, return_when=asyncio.FIRST_COMPLETED
-                )
-
-                if wait_task in done:
-                    # Shutdown event was set, break the loop
-                    get_task.cancel()
+            # Wait for new text or for the shutdown signal
+            item = await finished_text_queue.get()
+            # Every stabilized text contains the previous ones, so of a burst only the freshest is processed
+            while item is not _SHUTDOWN and not finished_text_queue.empty():
+                next_item = finished_text_queue.get_nowait()
+                if next_item is _SHUTDOWN:
+                    # Stop on the next iteration, after this text has been processed
+                    finished_text_queue.put_nowait(_SHUTDOWN)
                     break
-
-                stabilized_text = get_task.result()
-                for task in pending:
-                    task.cancel()
-
-            except asyncio.CancelledError:
+                item = next_item
+            if item is _SHUTDOWN:
                 break
+            stabilized_text = item
 
-            # Send the full transcript to the client
-            await websocket.send_text(
-                json.dumps({"type": "transcript", "data": stabilized_text})
-            )
+            if stabilized_text.startswith(previous_text):
+                # Only send what was added, the client appends it to its transcript
+                new_text = stabilized_text[len(previous_text):]
+                if new_text:
+                    send_message(websocket, "transcript_delta", new_text)
+            else:
+                # The transcript was revised rather than extended: send it in full,
+                # and count its sentences from scratch
+                send_message(websocket, "transcript", stabilized_text)
+                counted_sentences, scan_from = 0, 0
+            previous_text = stabilized_text
 
-            # print(f"Stabilized text: {stabilized_text}")
+            # logger.debug("Stabilized text: %s", stabilized_text)
 
-            # Count sentences in the stabilized text.
+            # Count sentences in the stabilized text, only scanning what was added.
             # This is a simple regex that looks for sentence-ending punctuation.
-            current_sentences = len(re.findall(r"[.!?]+", stabilized_text))
+            new_count, next_scan_from = count_sentence_ends(stabilized_text, scan_from)
+            current_sentences = counted_sentences + new_count
+            # A punctuation run at the very end is scanned again, it may continue in the next text
+            counted_sentences = current_sentences - (next_scan_from < len(stabilized_text))
+            scan_from = next_scan_from
 
             # Send the full transcript to the agent every N sentences.
             # Using modulo is more reliable than integer division for this.
             new_sentences = current_sentences - sentence_count
             if new_sentences >= 10:
-                print(f"Sending full transcript to agent after {new_sentences} new sentences. Total: {current_sentences}")
-                print(f"Transcript sent to the agent:\n{bcolors.OKBLUE}{stabilized_text}{bcolors.ENDC}")
-                await send_to_agent(stabilized_text)
+                logger.debug("Sending full transcript to agent after %d new sentences. Total: %d", new_sentences, current_sentences)
+                logger.debug("Transcript sent to the agent:\n%s%s%s", bcolors.OKBLUE, stabilized_text, bcolors.ENDC)
+                # Run the agent in the background, so new transcripts aren't held up by the LLM.
+                # While a call is in flight, the transcript waits in the pending slot and
+                # replaces any older one, so only the freshest transcript is analyzed next.
+                pending_transcript = stabilized_text
+                if not agent_lock.locked():
+                    agent_task = asyncio.create_task(drain_pending_transcript())
+                    agent_tasks.add(agent_task)
+                    agent_task.add_done_callback(agent_tasks.discard)
                 sentence_count = current_sentences
 
     except asyncio.CancelledError:
-        print("Transcription sender task cancelled.")
+        logger.info("Transcription sender task cancelled.")
+        cancelled = True
     except Exception as e:
-        print(f"An error occurred in transcription_sender: {e}")
+        logger.error("An error occurred in transcription_sender: %s", e)
     finally:
         # The final transcript is now handled by the message_receiver.
-        # This block is now only for cleaning up the transcription service.
+        # This block is now only for cleaning up the transcription service
+        # and the in-flight agent calls, which the final response supersedes.
+        for agent_task in list(agent_tasks):
+            agent_task.cancel()
+        # Let the cancelled calls unwind, so none of them writes to the thread after it is freed
+        await asyncio.gather(*agent_tasks, return_exceptions=True)
+        if cancelled and agent_service:
+            # No final response will be requested, free the agent's memory right away
+            agent_service.close(thread_id)
+        if shutdown_task:
+            shutdown_task.cancel()
     
-        print("Transcription service shutting down.")
+        logger.info("Transcription service shutting down.")
         if 'transcription_service' in locals() and transcription_service:
-            transcription_service.shutdown()
+            # Shutting down a recorder that can't be kept waits for its processes
+            await asyncio.to_thread(transcription_service.shutdown)
 
     # Return the final state to the caller for final processing, after cleanup.
-    return stabilized_text, agent_service, sentence_count
+    return stabilized_text, agent_service, thread_id, sentence_count
+
+async def handle_ping(websocket: WebSocket, data: dict, transcription_task_group, shutdown_events) -> bool:
+    """
+    Answers a health check ping.
+    """
+    websocket.state.outbox.put(_PONG_MESSAGE)
+    return False
+
+
+async def handle_start(websocket: WebSocket, data: dict, transcription_task_group, shutdown_events) -> bool:
+    """
+    Starts a new transcription task.
+    """
+    logger.info("Received start message.")
+    # Cancel any existing transcription task before starting a new one.
+    for task in transcription_task_group:
+        task.cancel()
+    # Notify the client that the service is starting
+    websocket.state.outbox.put(_STATUS_STARTING_MESSAGE)
+
+    language = data.get("language", DEFAULT_LANGUAGE)
+    if language not in SUPPORTED_LANGUAGES:
+        # Every language builds a permanent agent, so only the known ones are accepted
+        logger.warning("Unsupported language %r, falling back to '%s'.", language, DEFAULT_LANGUAGE)
+        language = DEFAULT_LANGUAGE
+    user_id = data.get("user_id", "none")
+
+    shutdown_event = asyncio.Event()
+    shutdown_events.append(shutdown_event)
+    # Create a new task in the provided task group
+    new_task = asyncio.create_task(
+        transcription_sender(websocket, language, shutdown_event, user_id)
+    )
+    transcription_task_group.add(new_task)
+    return False
+
+
+async def handle_stop(websocket: WebSocket, data: dict, transcription_task_group, shutdown_events) -> bool:
+    """
+    Stops the transcription tasks, sends the final insight and closes the connection.
+    """
+    logger.info("Received stop message. Signaling transcription tasks to shut down.")
+    # Signal all transcription tasks to shut down gracefully
+    for event in shutdown_events:
+        event.set()
+    logger.info("Waiting for transcription tasks to send final messages and clean up.")
+    # Await the completion of the tasks to ensure they finish gracefully.
+    results = await asyncio.gather(
+        *transcription_task_group, return_exceptions=True
+    )
+
+    # Process the final transcript after the transcriber has stopped.
+    if results and not isinstance(results[0], Exception):
+        stabilized_text, agent_service, thread_id, sentence_count = results[0]
+        if agent_service and stabilized_text:
+            # Ensure the connection is still open before sending the final response.
+            if websocket.client_state is WebSocketState.CONNECTED:
+                logger.info("Sending final transcript to agent and waiting for response.")
+                async with AGENT_CALL_SEMAPHORE:
+                    response = await agent_service.aget_response(stabilized_text, thread_id, final=True)
+                if response and response.strip().upper() != "[SILENT]":
+                    send_message(websocket, "insight", response)
+            else:
+                logger.info("Client disconnected before final agent response could be sent.")
+        if agent_service:
+            # The session is over, free the agent's memory
+            agent_service.close(thread_id)
+
+    logger.info("All tasks gracefully stopped. Closing connection.")
+    # Deliver the queued messages, then close the connection as the very last step.
+    await websocket.state.outbox.close()
+    await websocket.close()
+    return True
+
+
+# Client actions and their handlers; a handler returns True once the connection is closed
+MESSAGE_HANDLERS = {
+    "ping": handle_ping,
+    "start": handle_start,
+    "stop": handle_stop,
+}
+
 
 async def message_receiver(
     websocket: WebSocket, transcription_task_group, shutdown_events
@@ -132,65 +423,14 @@ async def message_receiver(
     try:
         while True:
             message = await websocket.receive_text()
-            data = json.loads(message)
-
-            action = data.get("action")
-            if action == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
-            elif action == "start":
-                print("Received start message.")
-                # Cancel any existing transcription task before starting a new one.
-                for task in transcription_task_group:
-                    task.cancel()
-                # Notify the client that the service is starting
-                await websocket.send_text(
-                    json.dumps({"type": "status", "data": "starting"})
-                )
-
-                language = data.get("language", "de")
-                user_id = data.get("user_id", "none")
+            data = orjson.loads(message)
 
-                shutdown_event = asyncio.Event()
-                shutdown_events.append(shutdown_event)
-                # Create a new task in the provided task group
-                new_task = asyncio.create_task(
-                    transcription_sender(websocket, language, shutdown_event, user_id)
-                )
-                transcription_task_group.add(new_task)
-            elif action == "stop":
-                print("Received stop message. Signaling transcription tasks to shut down.")
-                # Signal all transcription tasks to shut down gracefully
-                for event in shutdown_events:
-                    event.set()
-                print("Waiting for transcription tasks to send final messages and clean up.")
-                # Await the completion of the tasks to ensure they finish gracefully.
-                results = await asyncio.gather(
-                    *transcription_task_group, return_exceptions=True
-                )
-                
-                # Process the final transcript after the transcriber has stopped.
-                if results and not isinstance(results[0], Exception):
-                    stabilized_text, agent_service, sentence_count = results[0]
-                    if agent_service and stabilized_text:
-                        # Ensure the connection is still open before sending the final response.
-                        if websocket.client_state.name == "CONNECTED":
-                            print("Sending final transcript to agent and waiting for response.")
-                            response = await asyncio.to_thread(
-                                agent_service.get_response, stabilized_text
-                            )
-                            if response and response.strip().upper() != "[SILENT]":
-                                await websocket.send_text(
-                                    json.dumps({"type": "insight", "data": response})
-                                )
-                        else:
-                            print("Client disconnected before final agent response could be sent.")
-
-                print("All tasks gracefully stopped. Closing connection.")
-                await websocket.close()  # Close the connection as the very last step.
+            handler = MESSAGE_HANDLERS.get(data.get("action"))
+            if handler and await handler(websocket, data, transcription_task_group, shutdown_events):
                 break # Exit the while loop.
 
     except WebSocketDisconnect:
-        print("Client disconnected from receiver.")
+        logger.info("Client disconnected from receiver.")
         # If the client disconnects, we still need to signal any running tasks to stop.
         for event in shutdown_events:
             event.set()
@@ -202,6 +442,8 @@ async def websocket_endpoint(websocket: WebSocket):
     It creates two concurrent tasks: one for receiving messages and one for sending them.
     """
     await websocket.accept()
+    # All messages to the client go through one writer task
+    websocket.state.outbox = MessageOutbox(websocket)
     transcription_tasks = set()
     shutdown_events = []
 
@@ -211,12 +453,19 @@ async def websocket_endpoint(websocket: WebSocket):
         await message_receiver(websocket, transcription_tasks, shutdown_events)
 
     except WebSocketDisconnect:
-        print("Client disconnected.")
+        logger.info("Client disconnected.")
     finally:
         # Ensure all transcription tasks are cancelled on disconnect.
         for task in transcription_tasks:
             task.cancel()
-        print("All transcription tasks cancelled.")
+        # A task may have finished before it was cancelled, without a stop to free its
+        # conversation; closing a thread twice is harmless
+        for result in await asyncio.gather(*transcription_tasks, return_exceptions=True):
+            if isinstance(result, tuple) and result[1]:
+                _, agent_service, thread_id, _ = result
+                agent_service.close(thread_id)
+        logger.info("All transcription tasks cancelled.")
+        await websocket.state.outbox.close()
 
 
 class bcolors:
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    A bounded LRU cache that maps transcript embeddings to agent responses,
+    so near-duplicate transcripts can reuse a previous answer instead of
+    invoking the LLM again.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 256):
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple[np.ndarray, str]]" = OrderedDict()
+        self._next_key = 0
+
+    @staticmethod
+    def normalize(embedding: List[float]) -> np.ndarray:
+        """
+        Normalizes an embedding once, so cosine similarity becomes a plain dot product.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: np.ndarray) -> Optional[str]:
+        """
+        Returns the cached response of the most similar entry above the threshold, or None.
+        """
+        if not self._entries:
+            return None
+
+        keys = list(self._entries.keys())
+        scores = np.stack([entry[0] for entry in self._entries.values()]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self._threshold:
+            return None
+
+        # Mark the entry as recently used.
+        key = keys[best]
+        self._entries.move_to_end(key)
+        return self._entries[key][1]
+
+    def store(self, vector: np.ndarray, response: str) -> None:
+        """
+        Adds a new entry, evicting the least recently used one when full.
+        """
+        self._entries[self._next_key] = (vector, response)
+        self._next_key += 1
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
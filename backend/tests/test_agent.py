@@ -1,4 +1,6 @@
 import asyncio
+import functools
+import re
 import sys
 import os
 
@@ -10,6 +12,10 @@ from backend.agent import AgentService
 from langgraph.graph import START, END
 
 
+# Splits after sentence-ending punctuation in a single pass
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
 class TestScenarios:
     """
     A container for different test transcript scenarios.
@@ -83,51 +89,82 @@ I am also very concerned about the weakness of the USD and other major currencie
 Of course. Let me work on that, and I'll send you the revised proposal by the end of the day.
 """
 
-async def run_long_transcript_test():
+@functools.cache
+def scenario_sentences(scenario_name: str) -> tuple[str, ...]:
+    """
+    Splits a scenario's transcript into sentences, once per scenario.
+    """
+    transcript = getattr(TestScenarios, scenario_name)
+    return tuple(s.strip() for s in SENTENCE_SPLIT_PATTERN.split(transcript) if s.strip())
+
+
+async def run_long_transcript_test(scenario_name: str, agent_service: AgentService):
     """
     Runs a test with a long, realistic transcript, calling the agent
     incrementally to simulate a real-time conversation.
     """
-    
-    # --- Select the test case to run ---
-    scenario_name = "STABLE_EN_FOCUS_CHF"
-    transcript_to_use = getattr(TestScenarios, scenario_name)
-    
-    # --- Determine language from the chosen transcript ---
-    if "_EN" in scenario_name:
-        language = "en"
-    else:
-        language = "de"
-
-    print("--- Initializing Agent Service for Long Transcript Test ---")
-    agent_service = AgentService(language=language, user_id="test_user_long_transcript")
-    print("--- Agent Service Initialized ---\n")
-
-    # Split the text into sentences, preserving the delimiters.
-    sentences = [s.strip() for s in transcript_to_use.replace('?', '?|').replace('.', '.|').replace('!', '!|').split('|') if s.strip()]
-
-    transcript_chunk = ""
+    # Scenarios run concurrently, so every line is tagged with its scenario
+    prefix = f"[{scenario_name}]"
+
+    thread_id = agent_service.new_thread(user_id=f"test_{scenario_name}")
+
+    sentences = scenario_sentences(scenario_name)
+
+    # Sentences are collected and only joined when the agent is called
+    transcript_parts: list[str] = []
     last_call_index = 0
     for i, sentence in enumerate(sentences):
-        transcript_chunk += (" " + sentence).strip()
+        transcript_parts.append(sentence)
         
         # Call agent after every 10th sentence
         if (i + 1) % 10 == 0:
-            print(f"--- Test Case: Calling agent after sentence {i + 1} ---")
-            print(f"Input Transcript: '{transcript_chunk}'")
-            await asyncio.to_thread(agent_service.get_response, transcript_chunk)
+            transcript_chunk = " ".join(transcript_parts)
+            print(f"{prefix} --- Test Case: Calling agent after sentence {i + 1} ---")
+            print(f"{prefix} Input Transcript: '{transcript_chunk}'")
+            response = await agent_service.aget_response(transcript_chunk, thread_id)
+            print(f"{prefix} Agent Response: {response}")
             print("-" * 20 + "\n")
             last_call_index = i + 1
 
     # Final call with the full transcript if it hasn't been called already
     if last_call_index < len(sentences):
-        print("--- Test Case: Final call with full transcript ---")
-        print(f"Input Transcript: '{transcript_chunk}'")
-        await asyncio.to_thread(agent_service.get_response, transcript_chunk)
+        transcript_chunk = " ".join(transcript_parts)
+        print(f"{prefix} --- Test Case: Final call with full transcript ---")
+        print(f"{prefix} Input Transcript: '{transcript_chunk}'")
+        response = await agent_service.aget_response(transcript_chunk, thread_id)
+        print(f"{prefix} Agent Response: {response}")
         print("-" * 20 + "\n")
 
+    agent_service.close(thread_id)
+
+
+async def run_all_scenarios():
+    """
+    Runs all test scenarios concurrently, so their LLM calls overlap.
+    Each scenario is its own conversation thread in the agent for its language.
+    """
+    scenario_names = [
+        "SAFETY_AND_INCOME_DE",
+        "GROWTH_DE",
+        "BALANCED_EN",
+        "STABLE_EN",
+        "STABLE_EN_FOCUS_CHF",
+    ]
+
+    print("--- Initializing Agent Services for Long Transcript Tests ---")
+    agent_services = {
+        language: AgentService(language=language) for language in ("de", "en")
+    }
+    print("--- Agent Services Initialized ---\n")
+
+    await asyncio.gather(*(
+        # Determine language from the scenario name
+        run_long_transcript_test(name, agent_services["en" if "_EN" in name else "de"])
+        for name in scenario_names
+    ))
+
 if __name__ == "__main__":
     # To run this script, navigate to your project's root directory and execute:
     # python -m backend.test_agent
     # asyncio.run(run_test())
-    asyncio.run(run_long_transcript_test())
\ No newline at end of file
+    asyncio.run(run_all_scenarios())
\ No newline at end of file
@@ -0,0 +1,90 @@
+import os
+import sys
+
+# This setup allows the tests to be run from the project root (e.g., `python -m pytest backend/tests`)
+# and handles the relative imports within the backend module correctly.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from langchain_core.messages import AIMessage
+
+from backend.agent import (
+    MAX_SEEN_INSIGHT_ITEMS,
+    _get_silence_pattern,
+    _process_response,
+    bounded_union,
+)
+
+
+GIVEN_INSIGHTS = [
+    "* Reduce equities to 30%.\n* Add CHF bonds to the portfolio.",
+    "* Propose a capital protected note in CHF.",
+]
+
+
+def filter_insight(content: str, insights: list[str] = GIVEN_INSIGHTS) -> str:
+    """
+    Runs the insight through the model node's filter, after the given insights were accepted.
+    """
+    silence_pattern = _get_silence_pattern("en")
+    state = {"ai_history": [], "seen_insight_items": ()}
+    for insight in insights:
+        update = _process_response(state, AIMessage(content=insight), silence_pattern)
+        state["seen_insight_items"] = bounded_union(state["seen_insight_items"], update.get("seen_insight_items", ()))
+
+    response = AIMessage(content=content)
+    _process_response(state, response, silence_pattern)
+    return response.content
+
+
+def test_exact_repetition_is_silenced():
+    assert filter_insight(GIVEN_INSIGHTS[0]) == "[SILENT]"
+
+
+def test_reordered_points_are_silenced():
+    assert filter_insight("* Add CHF bonds to the portfolio.\n* Reduce equities to 30%.") == "[SILENT]"
+
+
+def test_other_bullet_markers_and_spacing_are_silenced():
+    assert filter_insight("  - Reduce equities to 30%.  \n\n• Add CHF bonds to the portfolio.") == "[SILENT]"
+
+
+def test_single_earlier_point_is_silenced():
+    assert filter_insight("* Add CHF bonds to the portfolio.") == "[SILENT]"
+
+
+def test_points_combined_from_earlier_insights_are_silenced():
+    content = "* Propose a capital protected note in CHF.\n* Reduce equities to 30%."
+    assert filter_insight(content) == "[SILENT]"
+
+
+def test_reworded_point_is_kept():
+    # Only the bullet text is normalized; a paraphrase is a new point
+    content = "* Lower the equity share to 30%."
+    assert filter_insight(content) == content
+
+
+def test_new_point_among_earlier_ones_is_kept():
+    content = "* Reduce equities to 30%.\n* Check the client's liquidity needs."
+    assert filter_insight(content) == content
+
+
+def test_tool_calls_are_not_filtered():
+    silence_pattern = _get_silence_pattern("en")
+    state = {"ai_history": [], "seen_insight_items": ("Search products.",)}
+    response = AIMessage(
+        content="* Search products.",
+        tool_calls=[{"name": "search_structured_products", "args": {}, "id": "call_1"}],
+    )
+    update = _process_response(state, response, silence_pattern)
+    assert response.content == "* Search products."
+    assert "seen_insight_items" not in update
+
+
+def test_seen_points_are_bounded_to_the_most_recent():
+    seen = ()
+    for index in range(MAX_SEEN_INSIGHT_ITEMS + 10):
+        seen = bounded_union(seen, (f"Point {index}.",))
+    assert len(seen) == MAX_SEEN_INSIGHT_ITEMS
+    assert seen[0] == "Point 10."
+    # A point given again moves to the end instead of being evicted first
+    assert bounded_union(seen, ("Point 10.",))[-1] == "Point 10."
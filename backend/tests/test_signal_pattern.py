@@ -0,0 +1,84 @@
+import os
+import sys
+
+import pytest
+
+# This setup allows the tests to be run from the project root (e.g., `python -m pytest backend/tests`)
+# and handles the relative imports within the backend module correctly.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.agent import MAX_DEFERRED_CHARS, MIN_NEW_CHARS, SIGNAL_PATTERN, AgentService
+
+
+CLIENT_SENTENCES = [
+    "I want to put my money somewhere.",
+    "Meine Ersparnisse sollen wachsen.",
+    "We have kids, so we think about the future.",
+    "Ich habe 200000 auf dem Konto.",
+    "Ich habe 200'000 Franken geerbt.",
+    "We're worried about losing what we built up.",
+    "Unsere Tochter beginnt nächstes Jahr ihr Studium.",
+    "Die Hypothek auf unserem Haus läuft bald aus.",
+    "We'd like to pay less tax on our savings.",
+    "Ich mache mir Sorgen wegen der Inflation.",
+    "I'd prefer something safe, we can't afford a loss.",
+    "Could we look into ETFs or real estate?",
+]
+
+SMALL_TALK_SENTENCES = [
+    "Would you like a coffee?",
+    "Ich habe den Vertrag für das Auto unterschrieben.",
+    "That's an interesting story.",
+    "Das ist sicherlich richtig.",
+    "Im Herbst fahren wir in die Berge.",
+    "The connection was bad yesterday.",
+    "I work in marketing.",
+    "We took a taxi from the station.",
+]
+
+
+@pytest.mark.parametrize("sentence", CLIENT_SENTENCES)
+def test_client_sentences_are_signals(sentence):
+    assert SIGNAL_PATTERN.search(sentence)
+
+
+@pytest.mark.parametrize("sentence", SMALL_TALK_SENTENCES)
+def test_small_talk_is_not_a_signal(sentence):
+    assert not SIGNAL_PATTERN.search(sentence)
+
+
+def make_agent_service() -> AgentService:
+    """
+    Creates an agent without its graph or embeddings; only the transcript gating is used.
+    """
+    agent_service = AgentService.__new__(AgentService)
+    agent_service._last_transcript_by_thread = {}
+    return agent_service
+
+
+def test_small_talk_is_deferred_not_analyzed():
+    agent_service = make_agent_service()
+    agent_service._last_transcript_by_thread["t"] = "Guten Tag."
+
+    small_talk = "Guten Tag. Wie war die Anreise heute?"
+    assert agent_service._get_new_text(small_talk, "t") is None
+    assert agent_service._last_transcript_by_thread["t"] == "Guten Tag."
+
+    # The deferred small talk is part of the next addition
+    transcript = small_talk + " Wir möchten über unser Geld sprechen."
+    assert agent_service._get_new_text(transcript, "t") == transcript[len("Guten Tag."):]
+
+
+def test_deferred_text_is_analyzed_once_long_enough():
+    agent_service = make_agent_service()
+    transcript = "Wie war die Anreise heute? " * (MAX_DEFERRED_CHARS // 20)
+    assert len(transcript) >= MAX_DEFERRED_CHARS
+    assert agent_service._get_new_text(transcript, "t") == transcript
+
+
+def test_final_transcript_is_analyzed_without_signals():
+    agent_service = make_agent_service()
+    transcript = "Vielen Dank, das war ein gutes Gespräch."
+    assert len(transcript) >= MIN_NEW_CHARS
+    assert agent_service._get_new_text(transcript, "t") is None
+    assert agent_service._get_new_text(transcript, "t", final=True) == transcript
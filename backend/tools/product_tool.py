@@ -1,12 +1,22 @@
-import json
+import functools
+import orjson
 from pathlib import Path
+from types import MappingProxyType
 from typing import List, Optional
 from langchain_core.tools import tool
 
 # Load the product database once when the module is imported
 _db_path = Path(__file__).parent / "structured_products_db.json"
-with open(_db_path, "r") as f:
-    _product_db = json.load(f)
+# The products are read-only views, as the cached search results share them
+_product_db = [MappingProxyType(product) for product in orjson.loads(_db_path.read_bytes())]
+
+# Index the products by every (risk profile, currency) combination, with None matching any value,
+# so a search looks up its candidates instead of scanning the database. Database order is kept.
+_product_index: dict[tuple[Optional[str], Optional[str]], List[MappingProxyType]] = {}
+for _product in _product_db:
+    _risk_profile, _currency = _product["risk_profile"].lower(), _product["currency"].lower()
+    for _key in ((None, None), (_risk_profile, None), (None, _currency), (_risk_profile, _currency)):
+        _product_index.setdefault(_key, []).append(_product)
 
 
 @tool
@@ -23,19 +33,30 @@ def search_structured_products(
         currency: The desired currency of the product. Valid values are 'CHF', 'EUR', 'USD'.
         min_coupon_pa: The minimum annual coupon percentage (e.g., 5.5 for 5.5%).
     """
-    results = _product_db
-
-    if risk_profile:
-        results = [
-            p for p in results if p["risk_profile"].lower() == risk_profile.lower()
-        ]
-
-    if currency:
-        results = [p for p in results if p["currency"].lower() == currency.lower()]
+    # Canonicalize the arguments so equivalent queries share one cache entry
+    products = _search_products(
+        risk_profile.lower() if risk_profile else None,
+        currency.lower() if currency else None,
+        min_coupon_pa,
+    )
+    return [dict(product) for product in products]
+
+
+@functools.lru_cache(maxsize=256)
+def _search_products(
+    risk_profile: Optional[str],
+    currency: Optional[str],
+    min_coupon_pa: Optional[float],
+) -> tuple:
+    """
+    Filters the product database, memoized as the database never changes at runtime.
+    Expects lowercased criteria and returns a tuple of read-only products, so cached results cannot be altered.
+    """
+    results = _product_index.get((risk_profile or None, currency or None), [])
 
     if min_coupon_pa is not None:
         results = [
             p for p in results if p["coupon_pa"] and p["coupon_pa"] >= min_coupon_pa
         ]
 
-    return results 
\ No newline at end of file
+    return tuple(results)
@@ -1,5 +1,18 @@
+import asyncio
+import logging
 from asyncio import Queue
-from RealtimeSTT import AudioToTextRecorder
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from RealtimeSTT import AudioToTextRecorder
+
+logger = logging.getLogger(__name__)
+
+# A stopped recorder per device. Creating one loads the Whisper models, so a session takes over
+# the idle recorder when there is one instead of loading them again, whatever its language.
+# Only one is kept, with its microphone off, so idle recorders don't pile up or process audio.
+_IDLE_RECORDERS: dict[str, "AudioToTextRecorder"] = {}
 
 
 class TranscriptionService:
@@ -7,23 +20,51 @@ class TranscriptionService:
     Manages the AudioToTextRecorder instance and transcription state.
     """
 
-    def __init__(self, language: str, text_queue: Queue, finished_text_queue: Queue, device: str = "mps"):
+    def __init__(self, language: str, text_queue: deque, finished_text_queue: Queue, device: str = "mps"):
         self.language = language
         self.text_queue = text_queue
         self.finished_text_queue = finished_text_queue
         self.device = device
-        self._recorder: AudioToTextRecorder | None = None
+        self._recorder: "AudioToTextRecorder | None" = None
+        # The recorder calls back from its own thread; queue puts are handed to the event loop
+        self._loop = asyncio.get_running_loop()
+
+    @staticmethod
+    def preload():
+        """
+        Imports RealtimeSTT ahead of the first recorder, so starting one doesn't pay for loading torch.
+        """
+        try:
+            import RealtimeSTT  # noqa: F401
+        except ImportError as e:
+            logger.warning("TranscriptionService: Could not preload RealtimeSTT: %s", e)
 
-    def _create_recorder(self) -> AudioToTextRecorder:
+    @staticmethod
+    def shutdown_idle_recorders():
+        """
+        Shuts down the idle recorders, releasing their models and audio input.
+        Blocks until their processes have exited, so call it off the event loop.
+        """
+        for device in list(_IDLE_RECORDERS):
+            recorder = _IDLE_RECORDERS.pop(device, None)
+            if recorder:
+                recorder.shutdown()
+                logger.info("TranscriptionService: Idle recorder for device '%s' shut down.", device)
+
+    def _create_recorder(self) -> "AudioToTextRecorder":
         """Creates a new AudioToTextRecorder instance."""
-        print(f"TranscriptionService: Initializing recorder for language '{self.language}' with model 'nebi/whisper-large-v3-turbo-swiss-german-ct2' and device '{self.device}'.")
+        # RealtimeSTT pulls in torch and the Whisper stack; only import it once a recorder is needed
+        from RealtimeSTT import AudioToTextRecorder
+
+        logger.info("TranscriptionService: Initializing recorder for language '%s' with model 'nebi/whisper-large-v3-turbo-swiss-german-ct2' and device '%s'.", self.language, self.device)
         return AudioToTextRecorder(
             model="nebi/whisper-large-v3-turbo-swiss-german-ct2",
             language=self.language,
             device=self.device,
-            compute_type="auto",
-            on_realtime_transcription_update=self._get_on_realtime_text_update(),
-            on_realtime_transcription_stabilized=self._get_on_transcription_finished(),
+            # RealtimeSTT runs anything but CUDA (including "mps") on the CPU, where int8 is fastest
+            compute_type="float16" if self.device == "cuda" else "int8",
+            on_realtime_transcription_update=self._on_realtime_text_update,
+            on_realtime_transcription_stabilized=self._on_transcription_finished,
             realtime_model_type="tiny",
             enable_realtime_transcription=True,
             realtime_processing_pause=1, # Wait for a 1-second pause before stabilizing
@@ -31,37 +72,67 @@ class TranscriptionService:
             spinner=False
         )
 
-    def _get_on_realtime_text_update(self):
-        """Returns a thread-safe callback for text updates."""
+    def _on_realtime_text_update(self, text: str):
+        """Thread-safe callback for text updates."""
+        # logger.debug("TranscriptionService: Realtime update received: '%s'", text)
+        # The bounded deque drops stale partials, so only the latest one is kept
+        self.text_queue.append(text)
 
-        def on_realtime_text_update(text: str):
-            # print(f"TranscriptionService: Realtime update received: '{text}'")
-            self.text_queue.put_nowait(text)
+    def _on_transcription_finished(self, text: str):
+        """Thread-safe callback for finished text updates."""
+        # logger.debug("TranscriptionService: Stabilized text received: '%s'", text)
+        self._loop.call_soon_threadsafe(self._put_finished_text, text)
 
-        return on_realtime_text_update
+    def _put_finished_text(self, text: str):
+        """
+        Queues a stabilized text on the event loop, dropping the oldest one when the queue is full.
+        Every stabilized text contains the previous ones, so only the latest ones matter.
+        """
+        if self.finished_text_queue.full():
+            self.finished_text_queue.get_nowait()
+        self.finished_text_queue.put_nowait(text)
 
-    def _get_on_transcription_finished(self):
-        """Returns a thread-safe callback for finished text updates."""
-        def on_transcription_finished(text: str):
-            # print(f"TranscriptionService: Stabilized text received: '{text}'")
-            self.finished_text_queue.put_nowait(text)
-
-        return on_transcription_finished
+    def _reuse_recorder(self) -> "AudioToTextRecorder | None":
+        """Takes over the idle recorder for this device, if there is one."""
+        recorder = _IDLE_RECORDERS.pop(self.device, None)
+        if recorder is None:
+            return None
+        logger.info("TranscriptionService: Reusing recorder for language '%s'.", self.language)
+        # The language is passed along with every transcription request, so switching it needs no new models
+        recorder.language = self.language
+        # Route the recorder's callbacks to this session's queues
+        recorder.on_realtime_transcription_update = self._on_realtime_text_update
+        recorder.on_realtime_transcription_stabilized = self._on_transcription_finished
+        recorder.set_microphone(True)
+        return recorder
 
     def start(self):
-        print("TranscriptionService: Starting recorder.")
+        logger.info("TranscriptionService: Starting recorder.")
         if not self._recorder:
-            self._recorder = self._create_recorder()
+            self._recorder = self._reuse_recorder() or self._create_recorder()
         self._recorder.start()
 
     def stop(self):
-        """Stops and completely shuts down the recorder."""
-        print("TranscriptionService: Stopping recorder.")
+        """Stops the recorder and releases it from this session, see `shutdown`."""
+        logger.info("TranscriptionService: Stopping recorder.")
         self.shutdown()
 
     def shutdown(self):
-        """Explicitly stops and deletes the recorder instance to free resources."""
-        if hasattr(self, '_recorder') and self._recorder:
-            self._recorder.stop()
-            del self._recorder
-            print("TranscriptionService: Recorder shut down.")
+        """
+        Stops the recorder and keeps it, with its loaded models, as the device's idle recorder.
+        It is shut down instead if the device already has one, or if it is still recording.
+        Blocks while a recorder shuts down, so call it off the event loop.
+        """
+        if not self._recorder:
+            return
+        recorder, self._recorder = self._recorder, None
+        recorder.stop()
+        # RealtimeSTT ignores a stop right after the start; such a recorder would keep
+        # recording into this session's callbacks, so it can't be reused
+        if not recorder.is_recording:
+            recorder.set_microphone(False)
+            if _IDLE_RECORDERS.setdefault(self.device, recorder) is recorder:
+                logger.info("TranscriptionService: Recorder stopped and kept for reuse.")
+                return
+        recorder.shutdown()
+        logger.info("TranscriptionService: Recorder shut down.")
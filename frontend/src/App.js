@@ -7,6 +7,7 @@ function App() {
   const [userId, setUserId] = useState('');
   const [transcript, setTranscript] = useState('');
   const [insights, setInsights] = useState([]);
+  const [draftInsight, setDraftInsight] = useState(''); // The insight that is still being streamed
   const socket = useRef(null);
   const intentionalClose = useRef(false);
   const healthCheckInterval = useRef(null);
@@ -79,7 +80,16 @@ function App() {
       }
       if (message.type === 'transcript') {
         setTranscript(message.data);
+      } else if (message.type === 'transcript_delta') {
+        // Only the newly stabilized text is sent, append it to the transcript.
+        setTranscript(prevTranscript => prevTranscript + message.data);
+      } else if (message.type === 'insight_delta') {
+        setDraftInsight(prevDraft => prevDraft + message.data);
+      } else if (message.type === 'insight_discarded') {
+        setDraftInsight('');
       } else if (message.type === 'insight') {
+        // The final insight replaces the streamed draft.
+        setDraftInsight('');
         // Add the new insight only if it's different from the most recent one.
         setInsights(prevInsights => {
           if (prevInsights.length > 0 && prevInsights[0] === message.data) {
@@ -111,6 +121,7 @@ function App() {
     setAppStatus('initializing');
     setTranscript('');
     setInsights([]);
+    setDraftInsight('');
     connectWebSocket();
   };
 
@@ -206,6 +217,11 @@ function App() {
         <div className="column fluesterer-column">
           <h2>Der Flüsterer</h2>
           <div className="display-area insights-display">
+            {draftInsight && (
+              <div className="insight-item">
+                {draftInsight.split('\n').map((line, i) => <p key={i}>{line}</p>)}
+              </div>
+            )}
             {insights.map((insight, index) => (
               <div key={index} className="insight-item">
                 {insight.split('\n').map((line, i) => <p key={i}>{line}</p>)}